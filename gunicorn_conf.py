@@ -0,0 +1,24 @@
+# Gunicorn-Konfiguration für den Produktivbetrieb
+# Start: gunicorn -c gunicorn_conf.py server:app
+#
+# Der Flask-Entwicklungsserver bearbeitet Requests nur in einem Prozess.
+# Gunicorn startet mehrere Worker-Prozesse mit jeweils mehreren Threads,
+# sodass parallele Anfragen (z.B. langsame Thumbnail-Downloads) sich nicht gegenseitig blockieren.
+# Schreibzugriffe der Worker auf die Datenbank werden in server.py per fcntl.flock synchronisiert.
+
+import multiprocessing
+
+bind = '127.0.0.1:3000'
+
+workers = 2 * multiprocessing.cpu_count() + 1
+worker_class = 'gthread'
+threads = 8
+
+# Die App wird einmal im Master-Prozess geladen und dann per fork an die Worker verteilt
+preload_app = True
+
+
+# Datenbank schon im Master einlesen, damit alle Worker den Cache per Copy-on-Write teilen
+def when_ready(server):
+    import server as camper_server
+    camper_server.read_db()
@@ -4,37 +4,598 @@
 # Die API ermöglicht es dem Frontend, Daten aus der JSON-Datenbank zu lesen und zu schreiben.
 # Zusätzlich bietet der Server eine Thumbnail-API, die Bilder von URLs lädt, skaliert und als optimierte JPGs ausliefert.
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-import json
+from flask_compress import Compress
+import orjson
 import os
+import atexit
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from PIL import Image
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from cachetools import LRUCache
 from io import BytesIO
-import hashlib
+import xxhash
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# JSON-Provider auf Basis von orjson
+# orjson serialisiert direkt in UTF-8-Bytes und ist deutlich schneller als das json-Modul der Standardbibliothek.
+# Wird von Flask u.a. zum Einlesen von request.json genutzt; Antworten erzeugt der Server über jresp().
+class OrjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS), mimetype='application/json'
+        )
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
+# Komprimierung der JSON-Antworten (Brotli, sonst gzip)
+# JSON mit vielen gleichen Schlüsseln lässt sich sehr gut komprimieren.
+# COMPRESS_REGISTER=False: Nur Routen mit @compress.compressed() werden komprimiert,
+# damit die Thumbnails (bereits komprimierte JPGs) nicht unnötig Rechenzeit kosten.
+app.config.update(
+    COMPRESS_REGISTER=False,
+    COMPRESS_ALGORITHM=['br', 'gzip'],
+    COMPRESS_MIMETYPES=['application/json'],
+    COMPRESS_LEVEL=4,
+    COMPRESS_BR_LEVEL=4,
+    COMPRESS_MIN_SIZE=1024,
+)
+compress = Compress(app)
+
 DB_FILE = 'datenbank.json'
+LOG_FILE = 'datenbank.log'
+LOCK_FILE = 'datenbank.lock'
+
+# Abstand in Sekunden, in dem ein Hintergrund-Thread geänderte Daten als Snapshot speichert
+# Mehrere schnell aufeinanderfolgende Änderungen werden so zu einem Schreibvorgang zusammengefasst.
+FLUSH_INTERVAL = 0.2
+
+# Felder, die in den Indizes als Schlüssel verwendet werden (je Änderungsart)
+INDEXED_FIELDS = {
+    'add_user': ('id', 'email'),
+    'add_vehicle': ('id', 'provider_id'),
+    'put_vehicle': ('id', 'provider_id'),
+    'add_booking': ('id', 'user_id', 'vehicle_id'),
+}
+
+# Prüft, ob ein Datensatz ein JSON-Objekt ist und alle Index-Felder als Schlüssel taugen
+# (z.B. ist eine Liste als user_id nicht erlaubt). Wirft sonst einen ValueError.
+def check_record(record, fields):
+    if not isinstance(record, dict):
+        raise ValueError("Request body must be a JSON object")
+    for field in fields:
+        try:
+            hash(record.get(field))
+        except TypeError:
+            raise ValueError(f"Invalid value for '{field}'") from None
+
+# Prüft den Datensatz einer Änderung (falls die Änderungsart einen hat)
+def check_op(op):
+    if op['op'] in INDEXED_FIELDS:
+        check_record(op['data'], INDEXED_FIELDS[op['op']])
+
+# Datenbank im Arbeitsspeicher mit Indizes
+# Neben den Rohdaten (data) werden Dictionaries aufgebaut, über die Benutzer, Fahrzeuge und Buchungen
+# direkt per ID bzw. Fremdschlüssel gefunden werden, statt jedes Mal die ganze Liste zu durchsuchen.
+# Schreibende Endpoints ändern Rohdaten und Indizes gemeinsam über apply() bzw. die add_/put_/delete_-Methoden.
+class DB:
+    def __init__(self, data):
+        self.data = data
+        self.data.setdefault('users', [])
+        self.data.setdefault('vehicles', [])
+        self.data.setdefault('bookings', [])
+
+        self.users_by_id = {}
+        self.users_by_email = {}
+        for u in self.users:
+            self._index_user(u)
+
+        self.vehicles_by_id = {}
+        self.vehicles_by_provider = {}
+        for v in self.vehicles:
+            self._index_vehicle(v)
+
+        # Zähler für automatisch vergebene Buchungs-IDs (b1, b2, b3, ...)
+        # Wird unter "_meta" mitgespeichert, damit gelöschte IDs auch nach einem Neustart nicht neu vergeben werden.
+        meta = self.data.setdefault('_meta', {})
+        self.next_booking_id = meta.get('next_booking_id', 1)
+
+        self.bookings_by_id = {}
+        self.bookings_by_user = {}
+        self.bookings_by_vehicle = {}
+        self.bookings_by_user_vehicle = {}
+        for b in self.bookings:
+            self._index_booking(b)
+        meta['next_booking_id'] = self.next_booking_id
+
+        # Laufnummer der letzten Änderung aus dem Log, die bereits in diesen Daten enthalten ist
+        self.log_seq = meta.get('log_seq', 0)
+
+    # Führt eine protokollierte Änderung aus (siehe db_apply) und gibt das Ergebnis der Methode zurück.
+    # Der Datensatz wird vor jeder Änderung geprüft, damit ungültige Daten nie in data landen.
+    # Neue Buchungen ohne ID erhalten hier ihre ID, damit sie mit im Log landet.
+    def apply(self, op):
+        check_op(op)
+        name = op['op']
+
+        if name == 'add_user':
+            result = self.add_user(op['data'])
+        elif name == 'add_vehicle':
+            result = self.add_vehicle(op['data'])
+        elif name == 'put_vehicle':
+            result = self.put_vehicle(op['id'], op['data'])
+        elif name == 'delete_vehicle':
+            result = self.delete_vehicle(op['id'])
+        elif name == 'add_booking':
+            if 'id' not in op['data']:
+                op['data']['id'] = self.new_booking_id()
+            result = self.add_booking(op['data'])
+        elif name == 'delete_booking':
+            result = self.delete_booking(op['id'])
+        else:
+            raise ValueError(f"Unknown operation: {name}")
+
+        self.log_seq = op['seq']
+        self.data['_meta']['log_seq'] = self.log_seq
+        return result
+
+    @property
+    def users(self):
+        return self.data['users']
+
+    @property
+    def vehicles(self):
+        return self.data['vehicles']
+
+    @property
+    def bookings(self):
+        return self.data['bookings']
+
+    # Bei doppelten IDs gewinnt wie bisher der erste Eintrag in der Liste
+    def _index_user(self, u):
+        self.users_by_id.setdefault(u.get('id'), u)
+        self.users_by_email.setdefault(u.get('email'), []).append(u)
+
+    def _index_vehicle(self, v):
+        self.vehicles_by_id.setdefault(v.get('id'), v)
+        self.vehicles_by_provider.setdefault(v.get('provider_id'), []).append(v)
+
+    def _index_booking(self, b):
+        booking_id = b.get('id')
+        self.bookings_by_id.setdefault(booking_id, b)
+        self.bookings_by_user.setdefault(b.get('user_id'), []).append(b)
+        self.bookings_by_vehicle.setdefault(b.get('vehicle_id'), []).append(b)
+        self.bookings_by_user_vehicle.setdefault((b.get('user_id'), b.get('vehicle_id')), []).append(b)
+
+        if isinstance(booking_id, str) and booking_id.startswith('b') and booking_id[1:].isdigit():
+            self.next_booking_id = max(self.next_booking_id, int(booking_id[1:]) + 1)
+
+    def add_user(self, user):
+        self.users.append(user)
+        self._index_user(user)
+
+    def add_vehicle(self, vehicle):
+        self.vehicles.append(vehicle)
+        self._index_vehicle(vehicle)
+
+    # Ersetzt das erste Fahrzeug mit der ID und gibt False zurück, falls es nicht existiert.
+    # Die Provider-Listen werden so angepasst, dass die Reihenfolge der Fahrzeugliste erhalten bleibt.
+    def put_vehicle(self, vehicle_id, vehicle):
+        old = self.vehicles_by_id.get(vehicle_id)
+        if old is None:
+            return False
+
+        vehicles = self.vehicles
+        vehicles[next(i for i, v in enumerate(vehicles) if v is old)] = vehicle
+
+        if vehicle.get('id') == vehicle_id:
+            self.vehicles_by_id[vehicle_id] = vehicle
+        else:
+            self._reindex_vehicle_id(vehicle_id)
+            self._reindex_vehicle_id(vehicle.get('id'))
+
+        if old.get('provider_id') == vehicle.get('provider_id'):
+            provided = self.vehicles_by_provider[old.get('provider_id')]
+            provided[next(i for i, v in enumerate(provided) if v is old)] = vehicle
+        else:
+            self._reindex_provider(old.get('provider_id'))
+            self._reindex_provider(vehicle.get('provider_id'))
+        return True
+
+    def delete_vehicle(self, vehicle_id):
+        removed = [v for v in self.vehicles if v.get('id') == vehicle_id]
+        if not removed:
+            return
+        self.data['vehicles'] = [v for v in self.vehicles if v.get('id') != vehicle_id]
+        self.vehicles_by_id.pop(vehicle_id, None)
+        for provider_id in {v.get('provider_id') for v in removed}:
+            self._reindex_provider(provider_id)
+
+    def _reindex_vehicle_id(self, vehicle_id):
+        match = next((v for v in self.vehicles if v.get('id') == vehicle_id), None)
+        if match is None:
+            self.vehicles_by_id.pop(vehicle_id, None)
+        else:
+            self.vehicles_by_id[vehicle_id] = match
+
+    def _reindex_provider(self, provider_id):
+        matches = [v for v in self.vehicles if v.get('provider_id') == provider_id]
+        if matches:
+            self.vehicles_by_provider[provider_id] = matches
+        else:
+            self.vehicles_by_provider.pop(provider_id, None)
+
+    # Vergibt die nächste freie Buchungs-ID, ohne die bestehenden Buchungen durchsuchen zu müssen
+    def new_booking_id(self):
+        booking_id = f'b{self.next_booking_id}'
+        self.next_booking_id += 1
+        self.data['_meta']['next_booking_id'] = self.next_booking_id
+        return booking_id
+
+    def add_booking(self, booking):
+        self.bookings.append(booking)
+        self._index_booking(booking)
+        self.data['_meta']['next_booking_id'] = self.next_booking_id
+
+    def delete_booking(self, booking_id):
+        removed = [b for b in self.bookings if b.get('id') == booking_id]
+        if not removed:
+            return
+        self.data['bookings'] = [b for b in self.bookings if b.get('id') != booking_id]
+        self.bookings_by_id.pop(booking_id, None)
+        for b in removed:
+            for index, key in ((self.bookings_by_user, b.get('user_id')),
+                               (self.bookings_by_vehicle, b.get('vehicle_id')),
+                               (self.bookings_by_user_vehicle, (b.get('user_id'), b.get('vehicle_id')))):
+                remaining = [x for x in index[key] if x is not b]
+                if remaining:
+                    index[key] = remaining
+                else:
+                    del index[key]
+
+# Zwischenspeicher für die Datenbank
+# _db_stat merkt sich Änderungszeit und Größe der Datei beim letzten Einlesen.
+# Solange sich die Datei nicht ändert, wird die Datenbank nicht erneut geparst.
+# Das RLock schützt sowohl das Einlesen als auch schreibende Requests (siehe db_apply).
+_db_cache = None
+_db_stat = None
+_db_lock = threading.RLock()
+
+# Append-only Log für Änderungen
+# Jede Änderung wird als eine JSON-Zeile an datenbank.log angehängt, statt die ganze Datenbank neu zu schreiben.
+# _log_offset ist die Position im Log, bis zu der die Einträge schon im Cache enthalten sind.
+# _log_seen ist die Dateigröße beim letzten Lesen (inkl. einer evtl. abgebrochenen letzten Zeile).
+# _log_ops zählt die Änderungen seit dem letzten Snapshot in datenbank.json.
+_log_file = None
+_log_offset = 0
+_log_seen = 0
+_log_ops = 0
+
+# Dateisperre für den Betrieb mit mehreren Prozessen (z.B. Gunicorn-Worker)
+# Schreibende Prozesse sperren exklusiv, das Neueinlesen des Snapshots sperrt geteilt.
+# Unter Windows gibt es kein fcntl; dort läuft nur der Entwicklungsserver mit einem Prozess.
+_lock_file = None
+_lock_depth = 0
+
+@contextmanager
+def db_file_lock(exclusive=True):
+    global _lock_file, _lock_depth
+
+    with _db_lock:
+        if fcntl is None or _lock_depth > 0:
+            _lock_depth += 1
+            try:
+                yield
+            finally:
+                _lock_depth -= 1
+            return
+
+        if _lock_file is None:
+            _lock_file = open(LOCK_FILE, 'ab')
+        fcntl.flock(_lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        _lock_depth += 1
+        try:
+            yield
+        finally:
+            _lock_depth -= 1
+            fcntl.flock(_lock_file.fileno(), fcntl.LOCK_UN)
+
+# Nach einem fork (Gunicorn mit preload_app) muss jeder Worker eigene Dateihandles öffnen,
+# sonst teilen sich alle Prozesse dieselbe Sperre und sperren sich nicht gegenseitig.
+# Auch der Flush-Thread existiert im Kindprozess nicht mehr und wird bei Bedarf neu gestartet.
+def _reset_file_handles():
+    global _lock_file, _lock_depth, _log_file, _flusher_started
+    _lock_file = None
+    _lock_depth = 0
+    _log_file = None
+    _flusher_started = False
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_file_handles)
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
 
-# Liest die gesamte Datenbank aus der JSON-Datei ein.
+# Liest die gesamte Datenbank aus der JSON-Datei ein und gibt sie als DB-Objekt zurück.
 # Falls die Datei nicht existiert, wird eine leere Struktur mit den drei Collections zurückgegeben.
-# Die Funktion wird bei jedem API-Request aufgerufen, um immer die aktuellen Daten zu haben.
+# Die Datei wird nur neu geparst (und die Indizes neu aufgebaut), wenn sie sich seit dem letzten Einlesen geändert hat.
+# Neue Einträge im Log (auch von anderen Prozessen) werden jeweils nachgespielt.
+# Das Ergebnis darf nur gelesen werden; Änderungen laufen über db_apply().
 def read_db():
-    if not os.path.exists(DB_FILE):
-        return {"users": [], "vehicles": [], "bookings": []}
+    global _db_cache, _db_stat, _log_offset, _log_seen, _log_ops
 
-    with open(DB_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    try:
+        st = os.stat(DB_FILE)
+        key = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        key = None
+
+    # Das DB-Objekt wird lokal gehalten: _db_cache kann von einem anderen Thread jederzeit verworfen werden
+    db = _db_cache
+    if db is None or key != _db_stat or _file_size(LOG_FILE) != _log_seen:
+        # Snapshot laden und Log nachspielen unter derselben geteilten Sperre, damit kein anderer
+        # Prozess dazwischen das Log kompaktieren (leeren) kann und Änderungen verloren gehen
+        with _db_lock, db_file_lock(exclusive=False):
+            try:
+                st = os.stat(DB_FILE)
+                key = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                key = None
+
+            db = _db_cache
+            if db is None or key != _db_stat or _file_size(LOG_FILE) < _log_offset:
+                if key is None:
+                    data = {"users": [], "vehicles": [], "bookings": []}
+                else:
+                    with open(DB_FILE, 'rb') as f:
+                        data = orjson.loads(f.read())
+                db = DB(data)
+                _db_cache = db
+                _db_stat = key
+                _log_offset = 0
+                _log_seen = 0
+                _log_ops = 0
+            _log_ops += replay_log(db)
+
+    return db
+
+# Spielt alle Log-Einträge ab _log_offset nach, deren Laufnummer neuer als der Datenstand ist.
+# Eine unvollständige letzte Zeile (Absturz mitten im Schreiben) wird übersprungen; sie wird vor dem
+# nächsten Schreiben abgeschnitten (siehe log_op). Vollständige, aber beschädigte Zeilen werden
+# mit einer Warnung übersprungen, damit die folgenden Änderungen nicht verloren gehen.
+def replay_log(db):
+    global _log_offset, _log_seen
+
+    if not os.path.exists(LOG_FILE):
+        return 0
+
+    count = 0
+    with open(LOG_FILE, 'rb') as f:
+        f.seek(_log_offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                op = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                app.logger.warning("Skipping corrupt line at offset %d in %s", _log_offset, LOG_FILE)
+                op = None
+            if op is not None and op['seq'] > db.log_seq:
+                db.apply(op)
+                count += 1
+            _log_offset += len(line)
+        _log_seen = f.tell()
+    return count
 
 # Schreibt die komplette Datenbank zurück in die JSON-Datei.
-# Die Daten werden formatiert (indent=2) gespeichert, damit sie menschenlesbar sind.
-# ensure_ascii=False sorgt dafür, dass deutsche Umlaute korrekt gespeichert werden.
-def write_db(data):
-    with open(DB_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+# Im Debug-Modus werden die Daten formatiert (OPT_INDENT_2) gespeichert, damit sie menschenlesbar sind.
+# Im Produktivbetrieb wird kompakt ohne Einrückung geschrieben, das spart Platz und Rechenzeit.
+# orjson schreibt immer UTF-8, deutsche Umlaute werden also korrekt gespeichert.
+# Es wird zuerst eine temporäre Datei geschrieben und dann per os.replace ausgetauscht,
+# damit bei einem Absturz nie eine halb geschriebene datenbank.json zurückbleibt.
+# Danach wird der Cache direkt aktualisiert, sodass der nächste Request nicht von der Platte lesen muss.
+def write_db(db):
+    global _db_cache, _db_stat
+
+    with db_file_lock():
+        tmp_path = DB_FILE + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            indent = orjson.OPT_INDENT_2 if app.debug else 0
+            f.write(orjson.dumps(db.data, option=indent | orjson.OPT_NON_STR_KEYS))
+            f.flush()
+            os.fsync(f.fileno())
+            st = os.fstat(f.fileno())
+        os.replace(tmp_path, DB_FILE)
+        _db_cache = db
+        _db_stat = (st.st_mtime_ns, st.st_size)
+
+# Hängt eine Änderung an das Log an und schreibt sie sofort auf die Platte (fsync).
+# Die Datei bleibt für die gesamte Laufzeit des Servers geöffnet (ungepuffert, damit nach einem
+# Fehler keine Reste im Puffer liegen bleiben). Muss unter der exklusiven Sperre aufgerufen werden.
+def log_op(op):
+    global _log_file, _log_offset, _log_seen
+
+    if _log_file is None:
+        _log_file = open(LOG_FILE, 'ab', buffering=0)
+    start = _truncate_torn_tail()
+
+    line = orjson.dumps(op, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    try:
+        if _log_file.write(line) != len(line):
+            raise OSError(f"Incomplete write to {LOG_FILE}")
+        os.fsync(_log_file.fileno())
+    except Exception:
+        # Halb geschriebene Zeile wieder entfernen, sonst würde die nächste Änderung direkt dahinter landen
+        try:
+            os.truncate(LOG_FILE, start)
+        except OSError:
+            pass
+        raise
+    _log_offset = _log_seen = start + len(line)
+
+# Schneidet eine unvollständige letzte Zeile im Log ab (z.B. nach einem Absturz beim Schreiben)
+# und gibt die neue Dateigröße zurück.
+def _truncate_torn_tail():
+    size = _file_size(LOG_FILE)
+    if size == 0:
+        return 0
+
+    with open(LOG_FILE, 'rb') as f:
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return size
+        end = 0
+        pos = size
+        while pos > 0:
+            chunk_start = max(0, pos - 4096)
+            f.seek(chunk_start)
+            i = f.read(pos - chunk_start).rfind(b'\n')
+            if i >= 0:
+                end = chunk_start + i + 1
+                break
+            pos = chunk_start
+
+    app.logger.warning("Truncating incomplete last line in %s", LOG_FILE)
+    os.truncate(LOG_FILE, end)
+    return end
+
+# Schreibt einen vollständigen Snapshot nach datenbank.json und leert danach das Log.
+# Die Laufnummer im Snapshot verhindert, dass Einträge doppelt nachgespielt werden,
+# falls der Server zwischen den beiden Schritten abstürzt.
+def compact_db():
+    global _log_offset, _log_seen, _log_ops
+
+    with db_file_lock():
+        # Prozesse ohne geladene Datenbank (z.B. nach _drop_cache) müssen nur tätig werden,
+        # wenn im Log noch Änderungen stehen
+        if _db_cache is None and _file_size(LOG_FILE) == 0:
+            return
+        db = read_db()
+        if _log_ops == 0:
+            return
+        write_db(db)
+        if _log_file is not None:
+            _log_file.truncate(0)
+        elif os.path.exists(LOG_FILE):
+            open(LOG_FILE, 'wb').close()
+        _log_offset = 0
+        _log_seen = 0
+        _log_ops = 0
+
+# Führt eine Änderung an der Datenbank aus und protokolliert sie.
+# Ungültige Datensätze führen zu einem ValueError, ohne dass etwas geändert wird.
+# Die Sperre verhindert, dass sich parallele Requests und Prozesse gegenseitig überschreiben.
+# op ist ein Dictionary wie {"op": "put_vehicle", "id": "v1", "data": {...}}.
+def db_apply(op):
+    global _log_ops
+
+    # Ungültige Daten werden vor jeder Änderung abgelehnt; der Cache bleibt dabei unverändert
+    check_op(op)
+
+    with db_file_lock():
+        db = read_db()
+        op['seq'] = db.log_seq + 1
+        try:
+            result = db.apply(op)
+            log_op(op)
+        except Exception:
+            # Cache verwerfen, damit eine halb ausgeführte oder nicht protokollierte Änderung
+            # nie gespeichert wird; der nächste Zugriff liest Snapshot und Log neu ein
+            _drop_cache()
+            raise
+        _log_ops += 1
+        _start_flusher()
+        return result
+
+def _drop_cache():
+    global _db_cache, _db_stat, _log_offset, _log_seen, _log_ops
+
+    _db_cache = None
+    _db_stat = None
+    _log_offset = 0
+    _log_seen = 0
+    _log_ops = 0
+
+# Hintergrund-Thread, der alle FLUSH_INTERVAL Sekunden einen Snapshot schreibt, falls sich etwas geändert hat.
+# Der Request muss so nie auf das Neuschreiben der ganzen Datenbank warten;
+# bis zum nächsten Snapshot sind die Änderungen über das Log gesichert.
+# Der Thread wird erst bei der ersten Änderung gestartet, da Threads einen fork (Gunicorn) nicht überleben.
+_flusher_started = False
+
+def _start_flusher():
+    global _flusher_started
+
+    if not _flusher_started:
+        _flusher_started = True
+        threading.Thread(target=_flush_loop, name='db-flusher', daemon=True).start()
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        if _log_ops > 0:
+            try:
+                compact_db()
+            except OSError:
+                # Snapshot beim nächsten Durchlauf erneut versuchen, das Log sichert die Daten
+                pass
+
+# Beim Beenden des Servers wird ein letzter Snapshot geschrieben
+atexit.register(compact_db)
+
+# Erzeugt eine JSON-Antwort aus bereits fertig serialisierten Bytes.
+# Da die Länge vorab bekannt ist, wird Content-Length immer gesetzt und nie chunked übertragen.
+def jresp(data, status=200):
+    body = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return Response(body, status=status, mimetype='application/json',
+                    headers={'Content-Length': str(len(body))})
+
+# Ab dieser Anzahl Einträge wird eine Liste gestreamt statt komplett im Speicher serialisiert
+STREAM_MIN_ITEMS = 1000
+# Anzahl Einträge, die beim Streamen jeweils gemeinsam serialisiert werden
+STREAM_BATCH_SIZE = 100
+
+# Erzeugt ein JSON-Array stückweise: '[' + Blöcke von Einträgen + ']'.
+# So liegt nie die ganze Antwort gleichzeitig im Speicher und die ersten Bytes gehen früher raus.
+def stream_json_array(items):
+    yield b'['
+    for i in range(0, len(items), STREAM_BATCH_SIZE):
+        if i:
+            yield b','
+        # orjson liefert "[...]" – die eckigen Klammern des Blocks werden abgeschnitten
+        yield orjson.dumps(items[i:i + STREAM_BATCH_SIZE], option=orjson.OPT_NON_STR_KEYS)[1:-1]
+    yield b']'
+
+# Gibt eine Liste als JSON zurück: kleine Listen normal per jresp, große als Stream.
+# Die Liste wird vorher kopiert, damit parallele Änderungen den laufenden Stream nicht beeinflussen.
+def json_list_response(items):
+    if len(items) < STREAM_MIN_ITEMS:
+        return jresp(items)
+    return Response(stream_json_array(list(items)), mimetype='application/json')
 
 # ============================================
 # USERS ENDPOINTS
@@ -44,32 +605,33 @@ def write_db(data):
 # POST: Erstellt einen neuen Benutzer (Registrierung)
 # Die Email-Filterung wird genutzt um zu prüfen, ob ein Benutzer bereits existiert
 @app.route('/users', methods=['GET', 'POST'])
+@compress.compressed()
 def users():
-    db = read_db()
-
     if request.method == 'GET':
+        db = read_db()
         email = request.args.get('email')
         if email:
-            filtered = [u for u in db['users'] if u.get('email') == email]
-            return jsonify(filtered)
-        return jsonify(db['users'])
+            return jresp(db.users_by_email.get(email, []))
+        return json_list_response(db.users)
 
     elif request.method == 'POST':
         new_user = request.json
-        db['users'].append(new_user)
-        write_db(db)
-        return jsonify(new_user), 201
+        try:
+            db_apply({"op": "add_user", "data": new_user})
+        except ValueError as e:
+            return jresp({"error": str(e)}, 400)
+        return jresp(new_user, 201)
 
 # Gibt einen einzelnen Benutzer anhand seiner ID zurück.
 # Wird verwendet um Profil-Informationen anzuzeigen.
 # Gibt einen 404 Fehler zurück falls der Benutzer nicht gefunden wurde.
 @app.route('/users/<user_id>', methods=['GET'])
+@compress.compressed()
 def get_user(user_id):
-    db = read_db()
-    user = next((u for u in db['users'] if u['id'] == user_id), None)
+    user = read_db().users_by_id.get(user_id)
     if user:
-        return jsonify(user)
-    return jsonify({"error": "User not found"}), 404
+        return jresp(user)
+    return jresp({"error": "User not found"}, 404)
 
 # ============================================
 # VEHICLES ENDPOINTS
@@ -79,48 +641,52 @@ def get_user(user_id):
 # POST: Erstellt ein neues Fahrzeug (wird vom Provider-Dashboard genutzt)
 # Die Provider-Filterung ermöglicht es Anbietern, nur ihre eigenen Fahrzeuge zu sehen
 @app.route('/vehicles', methods=['GET', 'POST'])
+@compress.compressed()
 def vehicles():
-    db = read_db()
-
     if request.method == 'GET':
+        db = read_db()
         provider_id = request.args.get('provider_id')
         if provider_id:
-            filtered = [v for v in db['vehicles'] if v.get('provider_id') == provider_id]
-            return jsonify(filtered)
-        return jsonify(db['vehicles'])
+            return jresp(db.vehicles_by_provider.get(provider_id, []))
+        return json_list_response(db.vehicles)
 
     elif request.method == 'POST':
         new_vehicle = request.json
-        db['vehicles'].append(new_vehicle)
-        write_db(db)
-        return jsonify(new_vehicle), 201
+        try:
+            db_apply({"op": "add_vehicle", "data": new_vehicle})
+        except ValueError as e:
+            return jresp({"error": str(e)}, 400)
+        # Thumbnails der Fahrzeugbilder schon jetzt im Hintergrund erzeugen
+        # images wird nur als Liste akzeptiert, sonst würde über die Zeichen eines Strings iteriert
+        images = new_vehicle.get('images')
+        prewarm_thumbnails(images if isinstance(images, list) and images else [new_vehicle.get('img')])
+        return jresp(new_vehicle, 201)
 
 # GET: Gibt ein spezifisches Fahrzeug zurück (für Detailseite)
 # PUT: Aktualisiert ein Fahrzeug komplett (Provider bearbeitet sein Fahrzeug)
 # DELETE: Löscht ein Fahrzeug aus der Datenbank (Provider entfernt sein Fahrzeug)
 # Die vehicle_id kommt direkt aus der URL (z.B. /vehicles/v1)
 @app.route('/vehicles/<vehicle_id>', methods=['GET', 'PUT', 'DELETE'])
+@compress.compressed()
 def get_vehicle(vehicle_id):
-    db = read_db()
-
     if request.method == 'GET':
-        vehicle = next((v for v in db['vehicles'] if v['id'] == vehicle_id), None)
+        vehicle = read_db().vehicles_by_id.get(vehicle_id)
         if vehicle:
-            return jsonify(vehicle)
-        return jsonify({"error": "Vehicle not found"}), 404
+            return jresp(vehicle)
+        return jresp({"error": "Vehicle not found"}, 404)
 
     elif request.method == 'PUT':
         updated_data = request.json
-        for i, vehicle in enumerate(db['vehicles']):
-            if vehicle['id'] == vehicle_id:
-                db['vehicles'][i] = updated_data
-                write_db(db)
-                return jsonify(updated_data)
-        return jsonify({"error": "Vehicle not found"}), 404
+        try:
+            updated = db_apply({"op": "put_vehicle", "id": vehicle_id, "data": updated_data})
+        except ValueError as e:
+            return jresp({"error": str(e)}, 400)
+        if updated:
+            return jresp(updated_data)
+        return jresp({"error": "Vehicle not found"}, 404)
 
     elif request.method == 'DELETE':
-        db['vehicles'] = [v for v in db['vehicles'] if v['id'] != vehicle_id]
-        write_db(db)
+        db_apply({"op": "delete_vehicle", "id": vehicle_id})
         return '', 204
 
 # ============================================
@@ -132,55 +698,50 @@ def get_vehicle(vehicle_id):
 # Die Filterung nach user_id wird für die Profil-Seite genutzt (Meine Buchungen)
 # Die Filterung nach vehicle_id wird für den Verfügbarkeits-Check genutzt (Kalender)
 @app.route('/bookings', methods=['GET', 'POST'])
+@compress.compressed()
 def bookings():
-    db = read_db()
-
     if request.method == 'GET':
+        db = read_db()
         user_id = request.args.get('user_id')
         vehicle_id = request.args.get('vehicle_id')
 
-        result = db['bookings']
+        if user_id and vehicle_id:
+            result = db.bookings_by_user_vehicle.get((user_id, vehicle_id), [])
+        elif user_id:
+            result = db.bookings_by_user.get(user_id, [])
+        elif vehicle_id:
+            result = db.bookings_by_vehicle.get(vehicle_id, [])
+        else:
+            return json_list_response(db.bookings)
 
-        if user_id:
-            result = [b for b in result if b.get('user_id') == user_id]
-        if vehicle_id:
-            result = [b for b in result if b.get('vehicle_id') == vehicle_id]
-
-        return jsonify(result)
+        return jresp(result)
 
     elif request.method == 'POST':
         new_booking = request.json
 
         # Falls keine ID mitgeschickt wurde, generieren wir automatisch eine
-        # Wir suchen die nächste freie Nummer (b1, b2, b3, ...) und weisen diese zu
-        # So wird sichergestellt, dass jede Buchung eine eindeutige ID hat
-        if 'id' not in new_booking:
-            existing_ids = [b.get('id', '') for b in db['bookings']]
-            counter = 1
-            while f'b{counter}' in existing_ids:
-                counter += 1
-            new_booking['id'] = f'b{counter}'
-
-        db['bookings'].append(new_booking)
-        write_db(db)
-        return jsonify(new_booking), 201
+        # Die Nummer kommt aus einem fortlaufenden Zähler (b1, b2, b3, ...), der nur hochgezählt wird
+        # So wird sichergestellt, dass jede Buchung eine eindeutige ID hat (Vergabe in DB.apply)
+        try:
+            db_apply({"op": "add_booking", "data": new_booking})
+        except ValueError as e:
+            return jresp({"error": str(e)}, 400)
+        return jresp(new_booking, 201)
 
 # GET: Gibt eine einzelne Buchung anhand ihrer ID zurück
 # DELETE: Löscht eine Buchung (Stornierung)
 # Die Stornierung entfernt die Buchung komplett aus der Datenbank
 @app.route('/bookings/<booking_id>', methods=['GET', 'DELETE'])
+@compress.compressed()
 def get_booking(booking_id):
-    db = read_db()
-
     if request.method == 'GET':
-        booking = next((b for b in db['bookings'] if b['id'] == booking_id), None)
+        booking = read_db().bookings_by_id.get(booking_id)
         if booking:
-            return jsonify(booking)
-        return jsonify({"error": "Booking not found"}), 404
+            return jresp(booking)
+        return jresp({"error": "Booking not found"}, 404)
 
     elif request.method == 'DELETE':
-        db['bookings'] = [b for b in db['bookings'] if b['id'] != booking_id]
-        write_db(db)
+        db_apply({"op": "delete_booking", "id": booking_id})
         return '', 204
 
 # ============================================
@@ -191,6 +752,182 @@ CACHE_DIR = 'thumbnail_cache'
 if not os.path.exists(CACHE_DIR):
     os.makedirs(CACHE_DIR)
 
+# Standardbreite der Thumbnails (wird auch für das Vorberechnen beim Anlegen von Fahrzeugen genutzt)
+DEFAULT_THUMBNAIL_WIDTH = 400
+
+# Gemeinsame HTTP-Session für das Herunterladen der Originalbilder
+# Die Verbindungen zu den Bild-Servern (Discord, Unsplash, ...) werden per Keep-Alive wiederverwendet,
+# statt für jedes Bild einen neuen TCP/TLS-Verbindungsaufbau zu machen.
+# Kurzzeitige Serverfehler (502/503/504) und fehlgeschlagene Verbindungsaufbauten werden bis zu zweimal
+# mit kurzer Pause wiederholt. Lese-Timeouts werden nicht wiederholt (read=False), damit ein langsamer
+# Bild-Server einen Worker nicht mehrfach 10 Sekunden blockiert und der Client weiterhin 504 bekommt.
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=64,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, read=False, backoff_factor=0.1,
+                      status_forcelist=[502, 503, 504], raise_on_status=False),
+)
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+SESSION.headers.update({'Accept-Encoding': 'gzip', 'User-Agent': 'CamperRent/1.0'})
+
+# Thread-Pool zum Vorberechnen von Thumbnails im Hintergrund (siehe prewarm_thumbnails)
+EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# Zuletzt dekodierte Originalbilder (nach URL), begrenzt auf ca. 32 MB Pixeldaten pro Prozess
+# (jeder Gunicorn-Worker hat einen eigenen Cache, daher bewusst klein gehalten)
+# Wird dasselbe Bild in mehreren Breiten angefragt, muss es nur einmal geladen und dekodiert werden.
+# Einträge sind Tupel (RGB-Bild, Originalgröße); LRUCache selbst ist nicht threadsicher.
+SOURCE_IMAGES = LRUCache(maxsize=32 * 1024 * 1024, getsizeof=lambda entry: entry[0].width * entry[0].height * 3)
+_source_images_lock = threading.Lock()
+
+# Fertige Thumbnails als JPG-Bytes (nach Cache-Key), begrenzt auf ca. 64 MB pro Prozess
+# Ein Treffer wird direkt aus dem Speicher beantwortet, ohne die Datei im Cache-Verzeichnis zu lesen.
+THUMBNAILS = LRUCache(maxsize=64 * 1024 * 1024, getsizeof=len)
+_thumbnails_lock = threading.Lock()
+
+# Cache-Key generieren: xxHash (XXH3, 128 Bit) der URL plus die Breite
+# Dadurch wird jede URL+Breite-Kombination nur einmal verarbeitet
+# Gleiche Anfragen werden direkt aus dem Cache beantwortet
+# Der Key dient nur als Dateiname, deshalb reicht ein schneller nicht-kryptografischer Hash
+# lru_cache spart das erneute Hashen für häufig angefragte Bilder
+@lru_cache(maxsize=1024)
+def thumbnail_cache_key(image_url, width):
+    return f"{xxhash.xxh3_128_hexdigest(image_url.encode())}_{width}"
+
+# Legt fertige JPG-Bytes im Speicher-Cache ab (zu große Bilder werden übersprungen)
+def _remember_thumbnail(cache_key, data):
+    try:
+        with _thumbnails_lock:
+            THUMBNAILS[cache_key] = data
+    except ValueError:
+        pass
+
+# Gibt ein bereits erzeugtes Thumbnail als JPG-Bytes zurück oder None, falls es noch nicht existiert.
+# Zuerst wird im Speicher gesucht, danach im Cache-Verzeichnis (z.B. nach einem Neustart).
+def get_thumbnail(cache_key):
+    with _thumbnails_lock:
+        data = THUMBNAILS.get(cache_key)
+    if data is not None:
+        return data
+
+    try:
+        with open(os.path.join(CACHE_DIR, f"{cache_key}.jpg"), 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    _remember_thumbnail(cache_key, data)
+    return data
+
+# Sendet ein Thumbnail an den Client.
+# Da der Cache-Key ein Hash aus URL und Breite ist, ändert sich der Inhalt nie:
+# Der Browser darf das Bild ein Jahr lang cachen (immutable) und bekommt bei erneuter Anfrage
+# mit If-None-Match nur ein 304 Not Modified statt des ganzen Bildes.
+def send_thumbnail(cache_key, data):
+    response = Response(data, mimetype='image/jpeg')
+    response.set_etag(cache_key)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+# Lädt ein Originalbild herunter und dekodiert es als RGB-Bild, das für die gewünschte Breite reicht.
+# Gibt None zurück, falls der Bild-Server keinen Status 200 liefert.
+# Das Ergebnis wird in SOURCE_IMAGES zwischengespeichert und darf nicht verändert werden (vorher copy()).
+def load_source_image(image_url, width):
+    with _source_images_lock:
+        entry = SOURCE_IMAGES.get(image_url)
+    # Ein per draft() verkleinertes Bild ist nur wiederverwendbar, wenn es für die neue Breite groß genug ist
+    if entry is not None and (entry[0].size == entry[1] or entry[0].width >= width * 2):
+        return entry[0]
+
+    # Bild von der externen URL herunterladen
+    # Timeout von 3 Sekunden für den Verbindungsaufbau und 10 Sekunden für die Antwort
+    # verhindert, dass der Server hängt wenn die URL langsam ist
+    response = SESSION.get(image_url, timeout=(3, 10))
+    if response.status_code != 200:
+        return None
+
+    img = Image.open(BytesIO(response.content))
+    original_size = img.size
+
+    # Bei JPG-Bildern kann libjpeg schon beim Dekodieren um 1/2, 1/4 oder 1/8 verkleinern.
+    # Wir fordern mindestens die doppelte Zielbreite an, damit LANCZOS danach noch genug Details hat.
+    # Bei anderen Formaten (z.B. PNG) hat draft() keine Wirkung.
+    img.draft('RGB', (width * 2, 1))
+
+    # PNG-Bilder mit Transparenz müssen special behandelt werden
+    # JPG unterstützt keine Transparenz, deshalb legen wir einen weißen Hintergrund darunter
+    # Das verhindert schwarze Bereiche wo vorher Transparenz war
+    # alpha_composite verrechnet alle Kanäle in einem Durchgang, ohne das Bild per split() in Einzelkanäle zu kopieren
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img.convert('RGBA')).convert('RGB')
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.load()
+
+    try:
+        with _source_images_lock:
+            SOURCE_IMAGES[image_url] = (img, original_size)
+    except ValueError:
+        # Bild ist größer als der gesamte Cache und wird daher nicht gespeichert
+        pass
+    return img
+
+# Skaliert ein Bild auf die gewünschte Breite und legt das Thumbnail im Speicher und im Cache-Verzeichnis ab.
+# Gibt die JPG-Bytes zurück oder None, falls der Bild-Server keinen Status 200 liefert.
+# Netzwerk- und Bildfehler werden als Exception an den Aufrufer weitergegeben.
+def render_thumbnail(image_url, width):
+    cache_key = thumbnail_cache_key(image_url, width)
+    cache_path = os.path.join(CACHE_DIR, f"{cache_key}.jpg")
+
+    source = load_source_image(image_url, width)
+    if source is None:
+        return None
+    img = source.copy()
+
+    # Bild mit hochwertiger LANCZOS-Filterung auf die gewünschte Breite verkleinern
+    # thumbnail() behält das Seitenverhältnis bei: Ein 1200x800 Bild wird bei width=400 zu 400x267.
+    # Die Höhe ist praktisch unbegrenzt, damit nur die Breite ausschlaggebend ist.
+    # Kleinere Bilder werden nicht hochskaliert.
+    # LANCZOS bietet die beste Qualität beim Verkleinern von Bildern
+    # reducing_gap verkleinert große Bilder zuerst schnell per Box-Reduce um ganze Faktoren,
+    # sodass LANCZOS nur noch die letzten Faktor 3 rechnen muss (optisch kein Unterschied).
+    # Mit Pillow-SIMD (pip install pillow-simd) läuft derselbe Aufruf zusätzlich mit SSE4/AVX2.
+    img.thumbnail((width, width * 100), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    # Als JPG speichern mit Qualität 85 (guter Kompromiss zwischen Dateigröße und Qualität)
+    # optimize=True aktiviert zusätzliche Kompression für kleinere Dateien
+    buffer = BytesIO()
+    img.save(buffer, 'JPEG', quality=85, optimize=True)
+    data = buffer.getvalue()
+    _remember_thumbnail(cache_key, data)
+
+    # Erst in eine temporäre Datei schreiben und dann umbenennen, damit andere Prozesse
+    # nie ein halb geschriebenes Bild lesen
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, cache_path)
+    return data
+
+# Berechnet die Thumbnails für neue Bilder im Hintergrund vor (z.B. nach POST /vehicles).
+# Der Request wartet nicht darauf; Fehler werden ignoriert, der Thumbnail-Endpoint versucht es später erneut.
+def prewarm_thumbnails(image_urls, width=DEFAULT_THUMBNAIL_WIDTH):
+    for image_url in image_urls:
+        if isinstance(image_url, str) and image_url:
+            EXECUTOR.submit(_prewarm_thumbnail, image_url, width)
+
+def _prewarm_thumbnail(image_url, width):
+    if get_thumbnail(thumbnail_cache_key(image_url, width)) is not None:
+        return
+    try:
+        render_thumbnail(image_url, width)
+    except Exception:
+        pass
+
 # Thumbnail-Generator für optimierte Bilddarstellung
 # Diese Funktion lädt ein Bild von einer externen URL (z.B. Discord oder Unsplash),
 # skaliert es auf die gewünschte Breite und speichert es als optimiertes JPG.
@@ -208,72 +945,37 @@ def generate_thumbnail():
     try:
         image_url = request.args.get('url')
         if not image_url:
-            return jsonify({"error": "Missing 'url' parameter"}), 400
+            return jresp({"error": "Missing 'url' parameter"}, 400)
 
         # Breite aus Query-Parameter lesen und validieren
         # Wir erlauben nur Werte zwischen 50 und 2000 Pixel um Missbrauch zu verhindern
         try:
-            width = int(request.args.get('width', 400))
+            width = int(request.args.get('width', DEFAULT_THUMBNAIL_WIDTH))
             if width < 50 or width > 2000:
-                return jsonify({"error": "Width must be between 50 and 2000"}), 400
+                return jresp({"error": "Width must be between 50 and 2000"}, 400)
         except ValueError:
-            return jsonify({"error": "Invalid width parameter"}), 400
+            return jresp({"error": "Invalid width parameter"}, 400)
 
-        # Cache-Key generieren: MD5-Hash aus URL und Breite
-        # Dadurch wird jede URL+Breite-Kombination nur einmal verarbeitet
-        # Gleiche Anfragen werden direkt aus dem Cache beantwortet
-        cache_key = hashlib.md5(f"{image_url}_{width}".encode()).hexdigest()
-        cache_path = os.path.join(CACHE_DIR, f"{cache_key}.jpg")
+        cache_key = thumbnail_cache_key(image_url, width)
 
         # Wenn das Thumbnail bereits im Cache existiert, direkt zurückgeben
         # Das spart Zeit und Bandbreite, da das Bild nicht erneut heruntergeladen werden muss
-        if os.path.exists(cache_path):
-            return send_file(cache_path, mimetype='image/jpeg')
-
-        # Bild von der externen URL herunterladen
-        # Timeout von 10 Sekunden verhindert, dass der Server hängt wenn die URL langsam ist
-        response = requests.get(image_url, timeout=10)
-        if response.status_code != 200:
-            return jsonify({"error": "Failed to fetch image"}), 404
-
-        img = Image.open(BytesIO(response.content))
-
-        # PNG-Bilder mit Transparenz müssen special behandelt werden
-        # JPG unterstützt keine Transparenz, deshalb legen wir einen weißen Hintergrund darunter
-        # Das verhindert schwarze Bereiche wo vorher Transparenz war
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-
-        # Neue Größe berechnen unter Beibehaltung des Seitenverhältnisses
-        # Wenn das Originalbild 1200x800 ist und width=400 gewünscht wird,
-        # dann wird es auf 400x267 skaliert (gleiches Verhältnis)
-        aspect_ratio = img.height / img.width
-        new_width = width
-        new_height = int(width * aspect_ratio)
-
-        # Bild mit hochwertiger LANCZOS-Filterung skalieren
-        # LANCZOS bietet die beste Qualität beim Verkleinern von Bildern
-        # Alternative Methoden wie BILINEAR oder NEAREST würden schlechtere Ergebnisse liefern
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-        # Als JPG speichern mit Qualität 85 (guter Kompromiss zwischen Dateigröße und Qualität)
-        # optimize=True aktiviert zusätzliche Kompression für kleinere Dateien
+        data = get_thumbnail(cache_key)
+        if data is not None:
+            return send_thumbnail(cache_key, data)
+
         # Das fertige Thumbnail wird im Cache gespeichert und dann an den Client gesendet
-        img.save(cache_path, 'JPEG', quality=85, optimize=True)
-        return send_file(cache_path, mimetype='image/jpeg')
+        data = render_thumbnail(image_url, width)
+        if data is None:
+            return jresp({"error": "Failed to fetch image"}, 404)
+        return send_thumbnail(cache_key, data)
 
     except requests.exceptions.Timeout:
-        return jsonify({"error": "Request timeout while fetching image"}), 504
+        return jresp({"error": "Request timeout while fetching image"}, 504)
     except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"Failed to fetch image: {str(e)}"}), 500
+        return jresp({"error": f"Failed to fetch image: {str(e)}"}, 500)
     except Exception as e:
-        return jsonify({"error": f"Image processing failed: {str(e)}"}), 500
+        return jresp({"error": f"Image processing failed: {str(e)}"}, 500)
 
 # ============================================
 # SERVER INFO
@@ -283,8 +985,9 @@ def generate_thumbnail():
 # Dieser Endpoint ist nützlich zum Testen ob der Server läuft
 # und zeigt alle verfügbaren Endpoints mit Beispielen an
 @app.route('/', methods=['GET'])
+@compress.compressed()
 def root():
-    return jsonify({
+    return jresp({
         "message": "CamperRent API Server",
         "version": "1.0.0",
         "endpoints": {
@@ -295,9 +998,10 @@ def root():
         }
     })
 
-# Server starten
-# debug=True sorgt dafür, dass der Server automatisch neustartet wenn Code geändert wird
-# Das ist praktisch während der Entwicklung, sollte aber in Produktion deaktiviert werden
+# Server starten (Entwicklungsserver)
+# FLASK_DEBUG=1 sorgt dafür, dass der Server automatisch neustartet wenn Code geändert wird
+# Das ist praktisch während der Entwicklung, in Produktion läuft der Server über Gunicorn:
+#   gunicorn -c gunicorn_conf.py server:app
 if __name__ == '__main__':
     print(f"Server running on http://localhost:3000")
-    app.run(host='127.0.0.1', port=3000, debug=True)
+    app.run(host='127.0.0.1', port=3000, debug=os.environ.get('FLASK_DEBUG') == '1')